@@ -1,5 +1,8 @@
 import os
-from openai import OpenAI
+import asyncio
+import httpx
+from openai import AsyncOpenAI, RateLimitError, APIConnectionError, InternalServerError
+from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type
 from dotenv import load_dotenv
 
 # This text file was written with the help of ChatGPT (GPT-5)
@@ -12,13 +15,30 @@ CUSTOM_BASE_URL = "https://models.github.ai/inference"
 CUSTOM_API_KEY = os.getenv("MY_API_KEY")
 
 def setup_client():
-    client = OpenAI(
+    # Pooled keep-alive connections so the concurrent requests share TLS sessions
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+        timeout=60.0
+    )
+    client = AsyncOpenAI(
         base_url=CUSTOM_BASE_URL,
-        api_key=CUSTOM_API_KEY
+        api_key=CUSTOM_API_KEY,
+        http_client=http_client,
+        max_retries=0  # retries are handled by create_haiku
     )
     return client
 
-def get_haiku_variations(client, topic):
+# Back off and retry when the endpoint rate-limits us or the connection drops
+@retry(
+    wait=wait_exponential(multiplier=1, min=1, max=20),
+    stop=stop_after_attempt(5),
+    retry=retry_if_exception_type((RateLimitError, APIConnectionError, InternalServerError)),
+    reraise=True,
+)
+async def create_haiku(client, **kwargs):
+    return await client.chat.completions.create(**kwargs)
+
+async def get_haiku_variations(client, topic):
     system_prompt = (
         "You are a creative haiku poet focused on SEO and rich language. "
         "Write a traditional 5-7-5 syllable haiku about the given topic. "
@@ -33,26 +53,33 @@ def get_haiku_variations(client, topic):
         {"temperature": 0.6, "top_p": 0.8, "presence_penalty": 0.2, "frequency_penalty": 0.6},
     ]
 
-    for i, params in enumerate(settings, 1):
-        try:
-            response = client.chat.completions.create(
-                model="openai/gpt-4.1",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Write a creative, SEO-rich haiku about {topic} using vivid synonyms and beautiful imagery."}
-                ],
-                temperature=params["temperature"],
-                top_p=params["top_p"],
-                presence_penalty=params["presence_penalty"],
-                frequency_penalty=params["frequency_penalty"],
-                max_tokens=60,
-            )
-            haiku = response.choices[0].message.content.strip()
-            print(f"\nHaiku {i} (T={params['temperature']}, P={params['top_p']}):")
-            print(haiku)
-            print("-" * 50)
-        except Exception as e:
-            print(f"Error generating Haiku {i}: {e}")
+    # Send all variations at once so the total wait is roughly one round-trip
+    tasks = [
+        create_haiku(
+            client,
+            model="openai/gpt-4.1",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": f"Write a creative, SEO-rich haiku about {topic} using vivid synonyms and beautiful imagery."}
+            ],
+            temperature=params["temperature"],
+            top_p=params["top_p"],
+            presence_penalty=params["presence_penalty"],
+            frequency_penalty=params["frequency_penalty"],
+            max_tokens=60,
+        )
+        for params in settings
+    ]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    for i, (params, response) in enumerate(zip(settings, results), 1):
+        if isinstance(response, Exception):
+            print(f"Error generating Haiku {i}: {response}")
+            continue
+        haiku = response.choices[0].message.content.strip()
+        print(f"\nHaiku {i} (T={params['temperature']}, P={params['top_p']}):")
+        print(haiku)
+        print("-" * 50)
 
 def main():
     print("🌸 Welcome to the SEO Haiku Generator! 🌸")
@@ -63,7 +90,7 @@ def main():
 
     try:
         client = setup_client()
-        get_haiku_variations(client, topic)
+        asyncio.run(get_haiku_variations(client, topic))
     except Exception as e:
         print(f"Failed to connect to the LLM endpoint: {e}")
         print(f"Check if the server is running at {CUSTOM_BASE_URL}")
@@ -1,10 +1,28 @@
 import os
+import io
 import argparse
 import sys
 import requests
+from requests.adapters import HTTPAdapter
 import subprocess
-from openai import OpenAI
+import asyncio
+import functools
+import threading
+import httpx
+from concurrent.futures import ThreadPoolExecutor
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
+from llm_cache import cached_create, semantic_cached_create, load_semantic_cache, save_semantic_cache
+
+# Import the optional parsers once up front; install_and_import is only the fallback
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+try:
+    import docx
+except ImportError:
+    docx = None
 
 # This file was written with the help of ChatGPT (GPT-5)
 
@@ -15,45 +33,84 @@ load_dotenv()
 CUSTOM_BASE_URL = "https://models.github.ai/inference"
 CUSTOM_API_KEY = os.getenv("MY_API_KEY")
 
+# One shared session so URL sources reuse pooled keep-alive connections
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=32))
+SESSION.mount("http://", HTTPAdapter(pool_connections=16, pool_maxsize=32))
 
+# Very long files are truncated to this many characters to stay safe
+MAX_CHARS = 12000
+
+
+_install_lock = threading.Lock()
+# PDFium is not thread-safe (not even across separate documents), so all pdfium calls share one lock
+_pdfium_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
 def install_and_import(package, import_name=None):
     """Helper to install a package if missing, then import it."""
     import importlib
-    try:
-        return importlib.import_module(import_name or package)
-    except ImportError:
-        print(f"📦 Installing missing package: {package} ...")
-        subprocess.check_call([sys.executable, "-m", "pip", "install", package])
-        return importlib.import_module(import_name or package)
-
-
-def load_source(source_path):
-    """Load text content from a source (URL, pdf, docx, csv, or text file)."""
+    # Sources load in parallel threads, so make sure pip only runs once per package
+    with _install_lock:
+        try:
+            return importlib.import_module(import_name or package)
+        except ImportError:
+            print(f"📦 Installing missing package: {package} ...")
+            subprocess.check_call([sys.executable, "-m", "pip", "install", package])
+            return importlib.import_module(import_name or package)
+
+
+def _join_limited(pieces, max_chars, sep=""):
+    """Join text pieces, but stop consuming them once more than max_chars are collected."""
+    # Write into one buffer as we go instead of keeping every piece around for a final join
+    buf = io.StringIO()
+    for i, piece in enumerate(pieces):
+        if i:
+            buf.write(sep)
+        buf.write(piece)
+        if buf.tell() > max_chars:
+            break
+    return buf.getvalue()[:max_chars + 1]
+
+
+def load_source(source_path, max_chars=MAX_CHARS):
+    """Load text content from a source (URL, pdf, docx, csv, or text file).
+
+    Reading stops after max_chars + 1 characters, so callers can still tell
+    that the source was longer than the limit without loading all of it.
+    """
     text = ""
     try:
         if source_path.startswith("http://") or source_path.startswith("https://"):
-            response = requests.get(source_path, timeout=10)
-            response.raise_for_status()
-            text = response.text
+            with SESSION.get(source_path, timeout=10, stream=True) as response:
+                response.raise_for_status()
+                response.encoding = response.encoding or "utf-8"
+                text = _join_limited(response.iter_content(chunk_size=8192, decode_unicode=True), max_chars)
 
         elif source_path.endswith(".pdf"):
-            PyPDF2 = install_and_import("PyPDF2")
-            with open(source_path, "rb") as f:
-                reader = PyPDF2.PdfReader(f)
-                text = "\n".join(page.extract_text() or "" for page in reader.pages)
+            # pypdfium2 wraps Chromium's PDFium in C, which is much faster than pure-Python parsing
+            pdf_lib = pdfium or install_and_import("pypdfium2")
+            with _pdfium_lock:
+                pdf = pdf_lib.PdfDocument(source_path)
+                try:
+                    pages = (page.get_textpage().get_text_range() for page in pdf)
+                    text = _join_limited(pages, max_chars, sep="\n")
+                finally:
+                    pdf.close()
 
         elif source_path.endswith(".docx"):
-            docx = install_and_import("python-docx", "docx")
-            doc = docx.Document(source_path)
-            text = "\n".join(p.text for p in doc.paragraphs)
+            docx_lib = docx or install_and_import("python-docx", "docx")
+            doc = docx_lib.Document(source_path)
+            text = _join_limited((p.text for p in doc.paragraphs), max_chars, sep="\n")
 
         elif source_path.endswith(".csv") or source_path.endswith(".txt"):
             with open(source_path, "r", encoding="utf-8", errors="ignore") as f:
-                text = f.read()
+                text = f.read(max_chars + 1)
 
         else:
             with open(source_path, "r", encoding="utf-8", errors="ignore") as f:
-                text = f.read()
+                text = f.read(max_chars + 1)
 
     except Exception as e:
         print(f"Warning: Could not load source '{source_path}'. Error: {e}")
@@ -87,8 +144,8 @@ def save_output(result_text, output_path):
             doc.build(story)
 
         elif ext == ".docx":
-            docx = install_and_import("python-docx", "docx")
-            Document = docx.Document
+            docx_lib = docx or install_and_import("python-docx", "docx")
+            Document = docx_lib.Document
             doc = Document()
             for line in result_text.split("\n"):
                 doc.add_paragraph(line)
@@ -111,24 +168,37 @@ def save_output(result_text, output_path):
         print(f"❌ Error saving output to {output_path}: {e}")
 
 
-def summarize_text(client, text, query=None):
+async def ask_llm(client, text, question, semantic=False):
+    """Ask a question about a text, going through the response cache."""
+    full_prompt = f"Context:\n{text}\n\nQuestion: {question}\nAnswer:"
+    messages = [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "user", "content": full_prompt}
+    ]
+    if not semantic:
+        # Identical prompts are served from the disk cache
+        return await cached_create(client, model="gpt-4o-mini", messages=messages)
+    # Also reuse answers to reworded questions about exactly the same text
+    return await semantic_cached_create(
+        client,
+        model="gpt-4o-mini",
+        messages=messages,
+        context=text,
+        question=question
+    )
+
+
+async def summarize_text(client, text, query=None, semantic=False):
     """Helper to summarize or answer a query on a given text chunk."""
     try:
-        full_prompt = f"Context:\n{text}\n\nQuestion: {query or 'Summarize the content'}\nAnswer:"
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": full_prompt}
-            ]
-        )
-        return response.choices[0].message.content.strip()
+        content = await ask_llm(client, text, query or "Summarize the content", semantic)
+        return content.strip()
     except Exception as e:
         print(f"Error during summarization: {e}")
         return ""
 
 
-def main():
+async def main():
     parser = argparse.ArgumentParser(
         description="A simple command-line utility to query OpenAI LLMs with data sources.",
         epilog="Example: python assignment-4.py notes.txt file.pdf -q \"Summarize these files\" -o summary.pdf"
@@ -139,27 +209,57 @@ def main():
 
     args = parser.parse_args()
 
-    client = OpenAI(
+    # Pooled keep-alive connections so the map and reduce calls share TLS sessions
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+        timeout=60.0
+    )
+    client = AsyncOpenAI(
         base_url=CUSTOM_BASE_URL,
-        api_key=CUSTOM_API_KEY
+        api_key=CUSTOM_API_KEY,
+        http_client=http_client,
+        max_retries=0  # llm_cache retries the chat call itself
     )
 
-    # --- MAP STEP: Summarize each file individually ---
-    summaries = []
-    for source in args.sources:
-        print(f"-> Processing: {source}")
-        file_text = load_source(source)
+    # --- LOAD STEP: Read all sources in worker threads so downloads and parsing overlap ---
+    def load_and_report(source):
+        text = load_source(source)
+        print(f"-> Loaded: {source}")
+        return text
+
+    print(f"-> Processing {len(args.sources)} source(s)...")
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=min(16, len(args.sources))) as executor:
+        texts = await asyncio.gather(
+            *(loop.run_in_executor(executor, load_and_report, source) for source in args.sources)
+        )
+
+    prepared = []
+    for source, file_text in zip(args.sources, texts):
         if not file_text.strip():
             print(f"⚠️ No text found in {source}, skipping.")
             continue
 
-        # Truncate very long files to stay safe
-        MAX_CHARS = 12000
+        # Truncate very long files to stay safe (load_source already stopped reading just past the limit)
         if len(file_text) > MAX_CHARS:
-            print(f"⚠️ {source} is too long ({len(file_text)} chars). Truncating to {MAX_CHARS}.")
+            print(f"⚠️ {source} is longer than {MAX_CHARS} chars. Truncating to {MAX_CHARS}.")
             file_text = file_text[:MAX_CHARS]
 
-        summary = summarize_text(client, file_text, "Summarize this file in detail.")
+        prepared.append((source, file_text))
+
+    load_semantic_cache()
+
+    # --- MAP STEP: Summarize each file individually (all requests in flight at once) ---
+    # (the question never changes here, so only the exact-match cache can help)
+    tasks = [summarize_text(client, file_text, "Summarize this file in detail.") for _, file_text in prepared]
+    results = await asyncio.gather(*tasks)
+
+    summaries = []
+    for (source, _), summary in zip(prepared, results):
+        # summarize_text reports its own errors and returns "" on failure
+        if not summary:
+            print(f"⚠️ No summary produced for {source}, skipping.")
+            continue
         summaries.append(f"--- Summary of {source} ---\n{summary}\n")
 
     if not summaries:
@@ -168,7 +268,9 @@ def main():
 
     # --- REDUCE STEP: Combine summaries into final answer ---
     combined_text = "\n".join(summaries)
-    final_answer = summarize_text(client, combined_text, args.query)
+    # The query varies between runs, so this is where the semantic cache pays off
+    final_answer = await summarize_text(client, combined_text, args.query, semantic=True)
+    save_semantic_cache()
 
     print("\n--- Final Result ---")
     print(final_answer)
@@ -180,4 +282,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
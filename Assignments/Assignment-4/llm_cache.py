@@ -0,0 +1,198 @@
+import os
+import json
+import math
+import time
+import hashlib
+from openai import RateLimitError, APIConnectionError, InternalServerError
+from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type
+
+# orjson is much faster for the long prompts in cache keys; fall back to json if it's missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Small on-disk cache for chat completions, so re-running the script on the
+# same files doesn't pay for the same LLM calls again.
+# Each response is stored as a JSON file named after the sha256 of the request.
+# On top of that, a semantic cache keeps question embeddings so a slightly
+# reworded question about exactly the same context can reuse an earlier answer.
+
+CACHE_DIR = os.path.expanduser("~/.llmcache")
+DEFAULT_TTL = 7 * 24 * 60 * 60  # one week, in seconds
+
+SEMANTIC_CACHE_PATH = os.path.join(CACHE_DIR, "semantic.json")
+EMBEDDING_MODEL = "text-embedding-3-small"
+SIMILARITY_THRESHOLD = 0.92
+MAX_SEMANTIC_ENTRIES = 200
+
+
+def cache_key(model, messages, **params):
+    """Build a stable key from the model, messages and any extra parameters."""
+    data = {"model": model, "messages": messages, **params}
+    if orjson is not None:
+        payload = orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+    else:
+        # Same compact UTF-8 output as orjson, so keys match either way
+        payload = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _cache_path(key):
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+
+def get_cached(key, ttl=DEFAULT_TTL):
+    """Return the cached content for a key, or None if missing or expired."""
+    try:
+        with open(_cache_path(key), "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - entry.get("created", 0) > ttl:
+        return None
+    return entry.get("content")
+
+
+def set_cached(key, content):
+    """Store content for a key. Failing to write the cache is never fatal."""
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = _cache_path(key) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "content": content}, f)
+        os.replace(tmp_path, _cache_path(key))
+    except OSError as e:
+        print(f"Warning: Could not write LLM cache entry. Error: {e}")
+
+
+# Only the chat call is retried, so a rate limit doesn't repeat the embedding request too
+@retry(
+    wait=wait_exponential(multiplier=1, min=1, max=20),
+    stop=stop_after_attempt(5),
+    retry=retry_if_exception_type((RateLimitError, APIConnectionError, InternalServerError)),
+    reraise=True,
+)
+async def _create_completion(client, **kwargs):
+    response = await client.chat.completions.create(**kwargs)
+    return response.choices[0].message.content
+
+
+async def cached_create(client, model, messages, ttl=DEFAULT_TTL, **params):
+    """Like client.chat.completions.create, but returns the message content and caches it."""
+    key = cache_key(model, messages, **params)
+    content = get_cached(key, ttl)
+    if content is not None:
+        return content
+
+    content = await _create_completion(client, model=model, messages=messages, **params)
+    set_cached(key, content)
+    return content
+
+
+def _normalize(vector):
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector] if norm else vector
+
+
+def _context_hash(context):
+    return hashlib.sha256(context.encode("utf-8")).hexdigest()
+
+
+# Semantic entries are read from disk once per run and written back once at the end
+_semantic_entries = None
+_semantic_dirty = False
+
+
+def load_semantic_cache(ttl=DEFAULT_TTL):
+    """Read the semantic cache from disk, dropping expired entries."""
+    global _semantic_entries
+    try:
+        with open(SEMANTIC_CACHE_PATH, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        entries = []
+    now = time.time()
+    _semantic_entries = [e for e in entries if now - e.get("created", 0) <= ttl]
+
+
+def save_semantic_cache():
+    """Write the semantic cache back to disk if anything was added this run."""
+    global _semantic_dirty
+    if not _semantic_dirty:
+        return
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = SEMANTIC_CACHE_PATH + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(_semantic_entries[-MAX_SEMANTIC_ENTRIES:], f)
+        os.replace(tmp_path, SEMANTIC_CACHE_PATH)
+        _semantic_dirty = False
+    except OSError as e:
+        print(f"Warning: Could not write semantic cache. Error: {e}")
+
+
+def _get_semantic_entries():
+    if _semantic_entries is None:
+        load_semantic_cache()
+    return _semantic_entries
+
+
+def find_similar(model, context, embedding, threshold=SIMILARITY_THRESHOLD):
+    """Return cached content for the same context whose question embedding is close enough."""
+    context_hash = _context_hash(context)
+    best_score, best_content = 0.0, None
+    for entry in _get_semantic_entries():
+        # Only questions about exactly the same context may share an answer
+        if entry.get("model") != model or entry.get("context_hash") != context_hash:
+            continue
+        # Both vectors are normalized, so the dot product is the cosine similarity
+        score = sum(a * b for a, b in zip(entry["embedding"], embedding))
+        if score > best_score:
+            best_score, best_content = score, entry.get("content")
+    return best_content if best_score >= threshold else None
+
+
+def add_similar(model, context, embedding, content):
+    """Remember a question embedding together with its context hash and the response."""
+    global _semantic_dirty
+    _get_semantic_entries().append({
+        "created": time.time(),
+        "model": model,
+        "context_hash": _context_hash(context),
+        "embedding": embedding,
+        "content": content,
+    })
+    _semantic_dirty = True
+
+
+async def semantic_cached_create(client, model, messages, context, question, ttl=DEFAULT_TTL, **params):
+    """Like cached_create, but also reuses answers to reworded questions about the same context.
+
+    The context must match exactly; only the (short) question is embedded and compared.
+    """
+    key = cache_key(model, messages, **params)
+    content = get_cached(key, ttl)
+    if content is not None:
+        return content
+
+    # Embeddings are far cheaper than a completion, but if they fail we just skip the semantic lookup
+    embedding = None
+    try:
+        result = await client.embeddings.create(model=EMBEDDING_MODEL, input=question)
+        embedding = _normalize(result.data[0].embedding)
+    except Exception as e:
+        print(f"Warning: Could not embed question for semantic cache. Error: {e}")
+
+    if embedding is not None:
+        content = find_similar(model, context, embedding)
+        if content is not None:
+            # Store the exact prompt too, so re-running it skips the embedding call
+            set_cached(key, content)
+            return content
+
+    content = await _create_completion(client, model=model, messages=messages, **params)
+    set_cached(key, content)
+    if embedding is not None and content is not None:
+        add_similar(model, context, embedding, content)
+    return content
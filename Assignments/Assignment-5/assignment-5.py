@@ -1,49 +1,97 @@
 import sys
 import base64
+import mimetypes
 import asyncio
-from openai import AsyncOpenAI
+import aiofiles
+import httpx
+from openai import AsyncOpenAI, RateLimitError, APIConnectionError, InternalServerError
+from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type
 from dotenv import load_dotenv
 import os
 import argparse
 
 # This script performs the following:
-# 1. Takes an input image file path. 
+# 1. Takes one or more input image file paths. 
 # 2. Uses GPT with vision capabilities to describe the image in one sentence.
 # 3. Uses the generated description to create a new image using DALL·E.
 # 4. Saves the newly generated image to a specified output file.
-# Install with: pip install openai python-dotenv
+# Install with: pip install openai python-dotenv aiofiles tenacity
 # Note: This script uses asynchronous programming for better performance.
+# When several input images are given, they are all processed concurrently.
 # The script supports image sizes: 1024x1024, 1024x1536, 1536x1024, and auto (default size: 1024x1024).
 # The generated image is saved in PNG format by default.
 # The script uses the gpt-4o-mini model for image description and gpt-image-1 for image generation.
 
-# Usage: python assignment-5.py <input_image_path> --size <image_size> --output <output_image_path>
+# Usage: python assignment-5.py <input_image_path> [<input_image_path> ...] --size <image_size> --output <output_image_path>
 # Example: python assignment-5.py input.jpg --size 1024x1024 --output new_image.png
+# Example: python assignment-5.py a.jpg b.png --output new_image.png  (saves new_image_0.png, new_image_1.png)
 
 # Parameters available:
 # --size: Size of the generated image (default: 1024x1024)
 # --output: Filename for the generated image (default: generated_image.png)
-# --image: Path to the input image file (required)
+#           With several input images, an index is added to the name for each one.
+# image: Path(s) to the input image file(s) (required)
 
 load_dotenv()
 
-async def image_to_text_to_image(image_path: str, size: str, output_path: str):
+# Both API calls back off and retry on rate limits, dropped connections and 5xx errors
+retry_transient = retry(
+    wait=wait_exponential(multiplier=1, min=1, max=20),
+    stop=stop_after_attempt(5),
+    retry=retry_if_exception_type((RateLimitError, APIConnectionError, InternalServerError)),
+    reraise=True,
+)
+
+def create_client():
     # Initialize client with API key from environment
-    client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    # (pooled keep-alive connections so all requests share TLS sessions)
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+        timeout=180.0
+    )
+    # (max_retries=0: retry_transient already retries, the SDK shouldn't retry on top of it)
+    return AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=http_client, max_retries=0)
+
+
+@retry_transient
+async def create_chat_completion(client: AsyncOpenAI, **kwargs):
+    return await client.chat.completions.create(**kwargs)
+
+
+@retry_transient
+async def create_image(client: AsyncOpenAI, **kwargs):
+    return await client.images.generate(**kwargs)
+
+
+async def encode_image(image_path: str) -> str:
+    # Build the data URL in one go, with the real MIME type (PNG inputs were labelled as JPEG before)
+    mime_type = mimetypes.guess_type(image_path)[0] or "image/jpeg"
+    async with aiofiles.open(image_path, "rb") as f:
+        image_bytes = await f.read()
+    data_url = b"data:" + mime_type.encode("ascii") + b";base64," + base64.b64encode(image_bytes)
+    return data_url.decode("ascii")
 
+
+async def save_image(image_base64: str, output_path: str):
+    async with aiofiles.open(output_path, "wb") as f:
+        await f.write(base64.b64decode(image_base64))
+
+
+async def image_to_text_to_image(client: AsyncOpenAI, image_path: str, size: str, output_path: str):
     # Step 1: Describe the image using GPT with vision
-    with open(image_path, "rb") as f:
-        image_bytes = f.read()
+    # (file reading is async so other images keep going meanwhile)
+    data_url = await encode_image(image_path)
 
-    print("Describing image...")
-    description_response = await client.chat.completions.create(
+    print(f"Describing image {image_path}...")
+    description_response = await create_chat_completion(
+        client,
         model="gpt-4o-mini",
         messages=[
             {"role": "system", "content": "You are a helpful assistant that describes images."},
             {"role": "user", "content": [
                 {"type": "text", "text": "Describe this image."},
                 {"type": "image_url", "image_url": {
-                    "url": "data:image/jpeg;base64," + base64.b64encode(image_bytes).decode()
+                    "url": data_url
                 }}
             ]}
         ],
@@ -51,11 +99,12 @@ async def image_to_text_to_image(image_path: str, size: str, output_path: str):
     )
 
     description = description_response.choices[0].message.content.strip()
-    print("\nImage Description:", description)
+    print(f"\nImage Description ({image_path}):", description)
 
     # Step 2: Generate image from description
-    print(f"\nGenerating image from description (size={size})...")
-    image_response = await client.images.generate(
+    print(f"\nGenerating image from description of {image_path} (size={size})...")
+    image_response = await create_image(
+        client,
         model="gpt-image-1",
         prompt=description,
         size=size,
@@ -64,17 +113,14 @@ async def image_to_text_to_image(image_path: str, size: str, output_path: str):
 
     # Save the generated image
     image_base64 = image_response.data[0].b64_json
-    generated_image = base64.b64decode(image_base64)
-
-    with open(output_path, "wb") as f:
-        f.write(generated_image)
+    await save_image(image_base64, output_path)
 
     print(f"\nNew image saved as: {output_path}")
 
 
 async def main():
     parser = argparse.ArgumentParser(description="Image → Text → Image generator using OpenAI")
-    parser.add_argument("image", help="Path to the input image file")
+    parser.add_argument("image", nargs="+", help="Path(s) to the input image file(s)")
     parser.add_argument("--size", default="1024x1024",
                         choices=["1024x1024", "1024x1536", "1536x1024", "auto"],
                         help="Size of generated image (default: 1024x1024)")
@@ -82,7 +128,28 @@ async def main():
                         help="Filename for the generated image (default: generated_image.png)")
     args = parser.parse_args()
 
-    await image_to_text_to_image(args.image, args.size, args.output)
+    client = create_client()
+
+    if len(args.image) == 1:
+        output_paths = [args.output]
+    else:
+        root, ext = os.path.splitext(args.output)
+        output_paths = [f"{root}_{i}{ext or '.png'}" for i in range(len(args.image))]
+
+    # Process all images concurrently; one failing image doesn't stop the others
+    results = await asyncio.gather(
+        *(image_to_text_to_image(client, path, args.size, output)
+          for path, output in zip(args.image, output_paths)),
+        return_exceptions=True
+    )
+
+    failed = False
+    for path, result in zip(args.image, results):
+        if isinstance(result, Exception):
+            print(f"Error processing {path}: {result}")
+            failed = True
+    if failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -1,23 +1,48 @@
 import argparse
 import os
 import requests
+import httpx
+from requests.adapters import HTTPAdapter
 import time
 import base64
+import functools
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from openai import OpenAI
+from openai import OpenAI, RateLimitError, APIConnectionError, InternalServerError
+from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 load_dotenv()
 
-client = OpenAI()
+@functools.cache
+def get_client():
+    # Created on first use so --help works without an API key configured,
+    # with pooled keep-alive connections for the OpenAI API
+    http_client = httpx.Client(
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+        timeout=180.0
+    )
+    # (max_retries=0: _generate_batch does its own retrying)
+    return OpenAI(http_client=http_client, max_retries=0)
 
 IMGBB_API_KEY = os.getenv("IMGBB_API_KEY")
 
+# One shared session so downloads and ImgBB uploads reuse pooled keep-alive connections
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=32))
+SESSION.mount("http://", HTTPAdapter(pool_connections=16, pool_maxsize=32))
+
 # This program supports the following parameters:
 # --prompt: Main text prompt for the image (required)
 # --negative_prompt: What to avoid in the image (optional)
 # --aspect_ratio: Aspect ratio of the image (default: 1:1). Supported: 1:1, 2:3, 3:2, auto, 16:9, 4:3, 3:4
-# --n: Number of images to generate (default: 1, max: 10
+# --n: Number of images to generate (default: 1). More than 10 are requested in parallel batches of 10
+# --no-local: Only upload to ImgBB, don't save the images locally
 
 
 # Aspect ratio presets mapped to valid API sizes
@@ -32,13 +57,20 @@ ASPECT_RATIOS = {
     "3:4": "1024x1536",    # Approximate -> portrait
 }
 
+# The images API returns at most this many images per request
+MAX_IMAGES_PER_REQUEST = 10
+# How many image requests may run at the same time (keeps us clear of rate limits)
+MAX_PARALLEL_BATCHES = 4
+
 def download_image(url, prefix="image"):
-    response = requests.get(url)
-    response.raise_for_status()
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"{prefix}_{timestamp}_{int(time.time()*1000)}.png"
-    with open(filename, "wb") as f:
-        f.write(response.content)
+    # Stream to disk in chunks instead of buffering the whole image in memory
+    with SESSION.get(url, stream=True, timeout=30) as response:
+        response.raise_for_status()
+        with open(filename, "wb") as f:
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                f.write(chunk)
     return filename
 
 def save_base64_image(b64_data, prefix="image"):
@@ -47,21 +79,75 @@ def save_base64_image(b64_data, prefix="image"):
     filename = f"{prefix}_{timestamp}_{int(time.time()*1000)}.png"
     with open(filename, "wb") as f:
         f.write(image_data)
-    return filename
+    return filename, image_data
 
-def upload_to_imgbb(filepath, api_key):
-    with open(filepath, "rb") as f:
-        image_data = f.read()
+def upload_to_imgbb(image, api_key):
+    # Accept raw bytes (already in memory) or a path to an image on disk
+    if isinstance(image, bytes):
+        image_data = image
+    else:
+        with open(image, "rb") as f:
+            image_data = f.read()
+    url = "https://api.imgbb.com/1/upload"
+    resp = SESSION.post(url, data={"key": api_key}, files={"image": ("image.png", image_data)}, timeout=60)
+    return _parse_imgbb_response(resp)
+
+def upload_encoded_to_imgbb(image, api_key):
+    # ImgBB also takes a base64 string or an image URL directly in the form field
     url = "https://api.imgbb.com/1/upload"
-    resp = requests.post(url, data={"key": api_key}, files={"image": image_data})
+    resp = SESSION.post(url, data={"key": api_key, "image": image}, timeout=60)
+    return _parse_imgbb_response(resp)
+
+def _parse_imgbb_response(resp):
     resp.raise_for_status()
-    j = resp.json()
+    j = orjson.loads(resp.content) if orjson is not None else resp.json()
     if j.get("success"):
         return j["data"]["url"]
     else:
         raise RuntimeError(f"ImgBB upload failed: {j}")
 
-def generate_images(prompt, negative_prompt=None, aspect_ratio="1:1", n=1):
+def _persist_and_upload(i, item, save_local=True):
+    if not save_local:
+        # Hand the payload straight to ImgBB without touching the disk
+        encoded = getattr(item, "b64_json", None) or getattr(item, "url", None)
+        if not encoded:
+            return None, None
+        hosted_url = upload_encoded_to_imgbb(encoded, IMGBB_API_KEY)
+        print(f"Uploaded image {i} -> {hosted_url}")
+        return None, hosted_url
+
+    # Prefer the inline base64 payload (gpt-image-1 always returns it) and only
+    # fall back to downloading when a model hands back a URL instead
+    if getattr(item, "b64_json", None):
+        filename, image_data = save_base64_image(item.b64_json, prefix=f"gen_{i}")
+    elif getattr(item, "url", None):
+        filename = download_image(item.url, prefix=f"gen_{i}")
+        image_data = filename
+    else:
+        return None, None
+
+    # Upload the decoded bytes directly instead of reading the file back from disk
+    hosted_url = upload_to_imgbb(image_data, IMGBB_API_KEY)
+    print(f"Uploaded {filename} -> {hosted_url}")
+    return filename, hosted_url
+
+# Rate limits and dropped connections are retried with exponential backoff
+@retry(
+    wait=wait_exponential(multiplier=1, min=1, max=20),
+    stop=stop_after_attempt(5),
+    retry=retry_if_exception_type((RateLimitError, APIConnectionError, InternalServerError)),
+    reraise=True,
+)
+def _generate_batch(client, full_prompt, size, n):
+    response = client.images.generate(
+        model="gpt-image-1",
+        prompt=full_prompt,
+        size=size,
+        n=n,
+    )
+    return response.data
+
+def generate_images(prompt, negative_prompt=None, aspect_ratio="1:1", n=1, save_local=True):
     if aspect_ratio not in ASPECT_RATIOS:
         raise ValueError(f"Unsupported aspect ratio {aspect_ratio}. Supported: {list(ASPECT_RATIOS.keys())}")
     
@@ -75,28 +161,39 @@ def generate_images(prompt, negative_prompt=None, aspect_ratio="1:1", n=1):
     if negative_prompt:
         full_prompt += f". Avoid: {negative_prompt}"
 
-    response = client.images.generate(
-        model="gpt-image-1",
-        prompt=full_prompt,
-        size=size,
-        n=n,
-    )
+    # Split large requests into batches of at most 10 and request them in parallel
+    # (the client is fetched once here so parallel batches can't race to create it)
+    client = get_client()
+    batch_sizes = [min(MAX_IMAGES_PER_REQUEST, n - start) for start in range(0, n, MAX_IMAGES_PER_REQUEST)]
+    images = []
+    errors = []
+    with ThreadPoolExecutor(max_workers=max(1, min(len(batch_sizes), MAX_PARALLEL_BATCHES))) as executor:
+        futures = {
+            executor.submit(_generate_batch, client, full_prompt, size, batch_n): batch_n
+            for batch_n in batch_sizes
+        }
+        # A failed batch must not throw away the images the other batches already generated
+        for future in as_completed(futures):
+            try:
+                images.extend(future.result())
+            except Exception as e:
+                print(f"Batch of {futures[future]} image(s) failed: {e}")
+                errors.append(e)
+
+    if errors and not images:
+        raise errors[0]
+
+    # Save and upload every image in parallel instead of one after another
+    with ThreadPoolExecutor(max_workers=max(1, min(len(images), 10))) as executor:
+        results = list(executor.map(lambda x: _persist_and_upload(*x, save_local=save_local), enumerate(images)))
 
     hosted_urls = []
     local_files = []
-    for i, item in enumerate(response.data):
-        if hasattr(item, "url") and item.url:
-            url = item.url
-            filename = download_image(url, prefix=f"gen_{i}")
-        elif hasattr(item, "b64_json") and item.b64_json:
-            filename = save_base64_image(item.b64_json, prefix=f"gen_{i}")
-        else:
-            continue
-
-        local_files.append(filename)
-        hosted_url = upload_to_imgbb(filename, IMGBB_API_KEY)
-        hosted_urls.append(hosted_url)
-        print(f"Uploaded {filename} -> {hosted_url}")
+    for filename, hosted_url in results:
+        if filename:
+            local_files.append(filename)
+        if hosted_url:
+            hosted_urls.append(hosted_url)
     
     return hosted_urls, local_files
 
@@ -106,6 +203,7 @@ def main():
     parser.add_argument("--negative_prompt", default=None, help="What to avoid in the image")
     parser.add_argument("--aspect_ratio", choices=ASPECT_RATIOS.keys(), default="1:1", help="Aspect ratio")
     parser.add_argument("--n", type=int, default=1, help="Number of images to generate")
+    parser.add_argument("--no-local", action="store_true", help="Only upload to ImgBB, don't save images locally")
     
     args = parser.parse_args()
 
@@ -114,15 +212,17 @@ def main():
         negative_prompt=args.negative_prompt,
         aspect_ratio=args.aspect_ratio,
         n=args.n,
+        save_local=not args.no_local,
     )
 
     print("\nHosted URLs (ImgBB):")
     for url in hosted_urls:
         print(url)
 
-    print("\nSaved Local Files:")
-    for fname in local_files:
-        print(fname)
+    if local_files:
+        print("\nSaved Local Files:")
+        for fname in local_files:
+            print(fname)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file